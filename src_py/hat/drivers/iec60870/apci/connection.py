@@ -1,6 +1,7 @@
 import asyncio
-import itertools
+import collections
 import logging
+import socket
 import typing
 
 from hat import aio
@@ -38,8 +39,9 @@ async def connect(addr: tcp.Address,
     conn = await tcp.connect(addr)
 
     try:
+        _set_socket_options(conn)
         _write_apdu(conn, common.APDUU(common.ApduFunction.STARTDT_ACT))
-        await aio.wait_for(_wait_startdt_con(conn), response_timeout)
+        await _wait_startdt_con(conn, response_timeout)
 
     except Exception:
         await aio.uncancellable(conn.async_close())
@@ -76,6 +78,8 @@ async def listen(connection_cb: ConnectionCb,
     """
     server = Server()
     server._connection_cb = connection_cb
+    server._connection_cb_is_async = asyncio.iscoroutinefunction(
+        connection_cb)
     server._response_timeout = response_timeout
     server._supervisory_timeout = supervisory_timeout
     server._test_timeout = test_timeout
@@ -108,6 +112,8 @@ class Server(aio.Resource):
         return self._srv.addresses
 
     async def _on_connection(self, conn):
+        _set_socket_options(conn)
+
         connection = Connection(conn=conn,
                                 always_enabled=False,
                                 response_timeout=self._response_timeout,
@@ -116,7 +122,11 @@ class Server(aio.Resource):
                                 send_window_size=self._send_window_size,
                                 receive_window_size=self._receive_window_size)
 
-        await aio.call(self._connection_cb, connection)
+        if self._connection_cb_is_async:
+            await self._connection_cb(connection)
+
+        else:
+            await aio.call(self._connection_cb, connection)
 
 
 class Connection(aio.Resource):
@@ -138,15 +148,30 @@ class Connection(aio.Resource):
         self._send_window_size = send_window_size
         self._receive_window_size = receive_window_size
         self._receive_queue = aio.Queue()
-        self._send_queue = aio.Queue()
-        self._test_event = asyncio.Event()
+        self._send_queue = collections.deque()
+        self._send_event = asyncio.Event()
+        self._sent_count = 0
+        self._written_count = 0
+        self._drain_event = None
+        self._test_event = None
         self._ssn = 0
         self._rsn = 0
         self._ack = 0
         self._w = 0
         self._supervisory_handle = None
-        self._waiting_ack_handles = {}
-        self._waiting_ack_cv = asyncio.Condition()
+        self._waiting_ack_handles = collections.deque()
+        self._window_event = None
+        self._out_buf = bytearray()
+        self._loop = asyncio.get_running_loop()
+        self._flush_scheduled = False
+        self._apdu_processors = {common.APDUU: self._process_apduu,
+                                 common.APDUS: self._process_apdus,
+                                 common.APDUI: self._process_apdui}
+
+        # bound methods registered as loop callbacks
+        self._flush_out_cb = self._flush_out
+        self._on_response_timeout_cb = self._on_response_timeout
+        self._on_supervisory_timeout_cb = self._on_supervisory_timeout
 
         self.async_group.spawn(self._read_loop)
         self.async_group.spawn(self._write_loop)
@@ -161,21 +186,28 @@ class Connection(aio.Resource):
         return self._conn.info
 
     def send(self, data: common.Bytes):
-        try:
-            self._send_queue.put_nowait(data)
-
-        except aio.QueueClosedError:
+        if self.is_closing:
             raise ConnectionError()
 
-    async def drain(self):
-        try:
-            future = asyncio.Future()
-            self._send_queue.put_nowait(future)
-            await future
+        self._send_queue.append(data)
+        self._sent_count += 1
+        self._send_event.set()
 
-        except aio.QueueClosedError:
+    async def drain(self):
+        if self.is_closing:
             raise ConnectionError()
 
+        # wait only for data sent prior to drain call
+        sent_count = self._sent_count
+        while self._written_count < sent_count:
+            drain_event = self._get_drain_event()
+            drain_event.clear()
+            await drain_event.wait()
+
+            if self.is_closing:
+                raise ConnectionError()
+
+        self._flush_out()
         await self._conn.drain()
 
     async def receive(self) -> common.Bytes:
@@ -186,6 +218,10 @@ class Connection(aio.Resource):
             raise ConnectionError()
 
     def _on_response_timeout(self):
+        # handles are not cancelled when connection is closed
+        if self.is_closing:
+            return
+
         mlog.warning("response timeout occured - closing connection")
         self.close()
 
@@ -193,29 +229,48 @@ class Connection(aio.Resource):
         self._supervisory_handle = None
 
         try:
-            _write_apdu(self._conn, common.APDUS(self._rsn))
+            self._write_apdu(common.APDUS(self._rsn))
             self._w = 0
 
         except Exception as e:
             mlog.warning('supervisory timeout error: %s', e, exc_info=e)
 
+    def _write_apdu(self, apdu):
+        encoder.encode_into(apdu, self._out_buf)
+
+        if self._flush_scheduled:
+            return
+
+        self._flush_scheduled = True
+        self._loop.call_soon(self._flush_out_cb)
+
+    def _flush_out(self):
+        self._flush_scheduled = False
+        if not self._out_buf:
+            return
+
+        # transport can keep reference to written data so buffer is
+        # handed over instead of being copied and cleared
+        data, self._out_buf = self._out_buf, bytearray()
+
+        try:
+            self._conn.write(data)
+
+        except Exception as e:
+            mlog.warning('write error: %s', e, exc_info=e)
+            self.close()
+
     async def _read_loop(self):
         try:
             while True:
                 apdu = await _read_apdu(self._conn)
 
-                if isinstance(apdu, common.APDUU):
-                    await self._process_apduu(apdu)
-
-                elif isinstance(apdu, common.APDUS):
-                    await self._process_apdus(apdu)
-
-                elif isinstance(apdu, common.APDUI):
-                    await self._process_apdui(apdu)
-
-                else:
+                process = self._apdu_processors.get(type(apdu))
+                if not process:
                     raise ValueError("unsupported APDU")
 
+                await process(apdu)
+
         except (ConnectionError, aio.QueueClosedError):
             pass
 
@@ -229,37 +284,50 @@ class Connection(aio.Resource):
     async def _write_loop(self):
         try:
             while True:
-                asdu = await self._send_queue.get()
+                if not self._send_queue:
+                    self._send_event.clear()
+                    await self._send_event.wait()
+                    continue
 
-                if isinstance(asdu, asyncio.Future):
-                    if not asdu.done():
-                        asdu.set_result(None)
+                if len(self._waiting_ack_handles) >= self._send_window_size:
+                    window_event = self._get_window_event()
+                    window_event.clear()
+                    await window_event.wait()
                     continue
 
-                if self._ssn in self._waiting_ack_handles:
-                    raise Exception("can not reuse already registered ssn")
+                while self._send_queue:
+                    if (len(self._waiting_ack_handles) >=
+                            self._send_window_size):
+                        break
 
-                async with self._waiting_ack_cv:
-                    await self._waiting_ack_cv.wait_for(
-                        lambda: (len(self._waiting_ack_handles) <
-                                 self._send_window_size))
+                    asdu = self._send_queue.popleft()
+                    self._written_count += 1
 
-                if not self._is_enabled:
-                    mlog.info("send data not enabled - discarding message")
-                    continue
+                    if not self._is_enabled:
+                        mlog.info("send data not enabled - discarding message")
+                        continue
 
-                _write_apdu(self._conn, common.APDUI(ssn=self._ssn,
-                                                     rsn=self._rsn,
-                                                     data=asdu))
-                self._w = 0
-                self._stop_supervisory_timeout()
+                    if (self._waiting_ack_handles and
+                            self._waiting_ack_handles[0][0] == self._ssn):
+                        raise Exception("can not reuse already registered ssn")
 
-                self._waiting_ack_handles[self._ssn] = (
-                    asyncio.get_event_loop().call_later(
-                        self._response_timeout, self._on_response_timeout))
-                self._ssn = (self._ssn + 1) % 0x8000
+                    self._write_apdu(common.APDUI(ssn=self._ssn,
+                                                  rsn=self._rsn,
+                                                  data=asdu))
+                    self._w = 0
+                    self._stop_supervisory_timeout()
 
-        except (ConnectionError, aio.QueueClosedError):
+                    handle = self._loop.call_later(
+                        self._response_timeout, self._on_response_timeout_cb)
+                    self._waiting_ack_handles.append((self._ssn, handle))
+                    self._ssn = (self._ssn + 1) & 0x7FFF
+
+                self._flush_out()
+
+                if self._drain_event:
+                    self._drain_event.set()
+
+        except ConnectionError:
             pass
 
         except Exception as e:
@@ -268,15 +336,12 @@ class Connection(aio.Resource):
         finally:
             self.close()
             self._stop_supervisory_timeout()
-            self._send_queue.close()
+            self._send_queue.clear()
 
-            for f in self._waiting_ack_handles.values():
-                f.cancel()
+            self._waiting_ack_handles.clear()
 
-            while not self._send_queue.empty():
-                asdu = self._send_queue.get_nowait()
-                if isinstance(asdu, asyncio.Future) and not asdu.done():
-                    asdu.set_exception(ConnectionError())
+            if self._drain_event:
+                self._drain_event.set()
 
     async def _test_loop(self):
         # TODO: implement reset timeout on received frame
@@ -284,12 +349,17 @@ class Connection(aio.Resource):
             while True:
                 await asyncio.sleep(self._test_timeout)
 
-                self._test_event.clear()
-                _write_apdu(self._conn,
-                            common.APDUU(common.ApduFunction.TESTFR_ACT))
+                test_event = self._get_test_event()
+                test_event.clear()
+                self._write_apdu(common.APDUU(common.ApduFunction.TESTFR_ACT))
 
-                await aio.wait_for(self._test_event.wait(),
-                                   self._response_timeout)
+                response_handle = self._loop.call_later(
+                    self._response_timeout, self._on_response_timeout_cb)
+                try:
+                    await test_event.wait()
+
+                finally:
+                    response_handle.cancel()
 
         except Exception as e:
             mlog.warning('test loop error: %s', e, exc_info=e)
@@ -300,68 +370,88 @@ class Connection(aio.Resource):
     async def _process_apduu(self, apdu):
         if apdu.function == common.ApduFunction.STARTDT_ACT:
             self._is_enabled = True
-            _write_apdu(self._conn,
-                        common.APDUU(common.ApduFunction.STARTDT_CON))
+            self._write_apdu(common.APDUU(common.ApduFunction.STARTDT_CON))
 
         elif apdu.function == common.ApduFunction.STOPDT_ACT:
             if not self._always_enabled:
-                _write_apdu(self._conn, common.APDUS(self._rsn))
+                self._write_apdu(common.APDUS(self._rsn))
                 self._w = 0
                 self._stop_supervisory_timeout()
                 self._is_enabled = False
-                _write_apdu(self._conn,
-                            common.APDUU(common.ApduFunction.STOPDT_CON))
+                self._write_apdu(common.APDUU(common.ApduFunction.STOPDT_CON))
 
         elif apdu.function == common.ApduFunction.TESTFR_ACT:
-            _write_apdu(self._conn,
-                        common.APDUU(common.ApduFunction.TESTFR_CON))
+            self._write_apdu(common.APDUU(common.ApduFunction.TESTFR_CON))
 
         elif apdu.function == common.ApduFunction.TESTFR_CON:
-            self._test_event.set()
+            if self._test_event:
+                self._test_event.set()
 
     async def _process_apdus(self, apdu):
-        await self._set_ack(apdu.rsn)
+        self._set_ack(apdu.rsn)
 
     async def _process_apdui(self, apdu):
-        await self._set_ack(apdu.rsn)
+        self._set_ack(apdu.rsn)
 
         if apdu.ssn != self._rsn:
             raise Exception('missing apdu sequence number')
 
-        self._rsn = (self._rsn + 1) % 0x8000
+        self._rsn = (self._rsn + 1) & 0x7FFF
         self._start_supervisory_timeout()
 
         if apdu.data:
             self._receive_queue.put_nowait(apdu.data)
 
         self._w += 1
-        if self._w >= self._receive_window_size:
-            _write_apdu(self._conn, common.APDUS(self._rsn))
-            self._w = 0
-            self._stop_supervisory_timeout()
+        if self._w < self._receive_window_size:
+            return
 
-    async def _set_ack(self, ack):
-        if ack >= self._ack:
-            ssns = range(self._ack, ack)
-        else:
-            ssns = itertools.chain(range(self._ack, 0x8000), range(ack))
+        # ack is carried by next APDUI if write loop can send one
+        # (supervisory timeout remains active as fallback)
+        if (self._send_queue and
+                self._is_enabled and
+                len(self._waiting_ack_handles) < self._send_window_size):
+            return
 
-        for ssn in ssns:
-            handle = self._waiting_ack_handles.pop(ssn, None)
-            if not handle:
-                raise Exception("received ack for unsent sequence number")
+        self._write_apdu(common.APDUS(self._rsn))
+        self._w = 0
+        self._stop_supervisory_timeout()
+
+    def _set_ack(self, ack):
+        # waiting ack handles contain exactly ssns in range [_ack, _ssn)
+        count = (ack - self._ack) & 0x7FFF
+        if count > len(self._waiting_ack_handles):
+            raise Exception("received ack for unsent sequence number")
+
+        for _ in range(count):
+            _, handle = self._waiting_ack_handles.popleft()
             handle.cancel()
 
         self._ack = ack
-        async with self._waiting_ack_cv:
-            self._waiting_ack_cv.notify_all()
+        if count and self._window_event:
+            self._window_event.set()
+
+    def _get_window_event(self):
+        if not self._window_event:
+            self._window_event = asyncio.Event()
+        return self._window_event
+
+    def _get_drain_event(self):
+        if not self._drain_event:
+            self._drain_event = asyncio.Event()
+        return self._drain_event
+
+    def _get_test_event(self):
+        if not self._test_event:
+            self._test_event = asyncio.Event()
+        return self._test_event
 
     def _start_supervisory_timeout(self):
         if self._supervisory_handle:
             return
 
-        self._supervisory_handle = asyncio.get_event_loop().call_later(
-            self._supervisory_timeout, self._on_supervisory_timeout)
+        self._supervisory_handle = self._loop.call_later(
+            self._supervisory_timeout, self._on_supervisory_timeout_cb)
 
     def _stop_supervisory_timeout(self):
         if not self._supervisory_handle:
@@ -372,15 +462,15 @@ class Connection(aio.Resource):
 
 
 async def _read_apdu(conn):
-    data = bytearray()
+    header = await conn.readexactly(2)
+    if header[0] != 0x68:
+        raise Exception('invalid start identifier')
 
-    while True:
-        size = encoder.get_next_apdu_size(data)
-        if size <= len(data):
-            break
-        data.extend(await conn.readexactly(size - len(data)))
+    # length is validated by decoder
+    size = header[1] + 2
+    body = await conn.readexactly(size - 2)
 
-    return encoder.decode(memoryview(data))
+    return encoder.decode(memoryview(header + body))
 
 
 def _write_apdu(conn, apdu):
@@ -388,16 +478,49 @@ def _write_apdu(conn, apdu):
     conn.write(data)
 
 
-async def _wait_startdt_con(conn):
-    while True:
-        req = await _read_apdu(conn)
+def _set_socket_options(conn):
+    sock = conn.get_extra_info('socket')
+    if sock is None:
+        return
 
-        if not isinstance(req, common.APDUU):
-            continue
+    # small control frames should not be delayed by coalescing
+    try:
+        if not sock.getsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY):
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
 
-        if req.function == common.ApduFunction.STARTDT_CON:
-            return
+    except OSError as e:
+        mlog.warning('error setting socket options: %s', e, exc_info=e)
+
+
+async def _wait_startdt_con(conn, timeout):
+    timed_out = False
+
+    def on_timeout():
+        nonlocal timed_out
+        timed_out = True
+        conn.close()
+
+    timeout_handle = asyncio.get_running_loop().call_later(timeout,
+                                                           on_timeout)
+
+    try:
+        while True:
+            req = await _read_apdu(conn)
+
+            if not isinstance(req, common.APDUU):
+                continue
+
+            if req.function == common.ApduFunction.STARTDT_CON:
+                return
+
+            if req.function == common.ApduFunction.TESTFR_ACT:
+                res = common.APDUU(common.ApduFunction.TESTFR_CON)
+                _write_apdu(conn, res)
+
+    except ConnectionError:
+        if timed_out:
+            raise asyncio.TimeoutError()
+        raise
 
-        if req.function == common.ApduFunction.TESTFR_ACT:
-            res = common.APDUU(common.ApduFunction.TESTFR_CON)
-            _write_apdu(conn, res)
+    finally:
+        timeout_handle.cancel()
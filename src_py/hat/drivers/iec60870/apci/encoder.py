@@ -1,4 +1,4 @@
-import itertools
+import struct
 
 from hat.drivers.iec60870.apci import common
 
@@ -42,6 +42,12 @@ def decode(data: common.Bytes) -> common.APDU:
 
 
 def encode(apdu: common.APDU) -> common.Bytes:
+    data = bytearray()
+    encode_into(apdu, data)
+    return bytes(data)
+
+
+def encode_into(apdu: common.APDU, data: bytearray):
     if isinstance(apdu, common.APDUI):
         if apdu.ssn > 0x7FFF:
             raise ValueError('invalid send sequence number')
@@ -49,27 +55,24 @@ def encode(apdu: common.APDU) -> common.Bytes:
             raise ValueError('invalid receive sequence number')
         if len(apdu.data) > 249:
             raise ValueError('unsupported data size')
-        data = [(apdu.ssn << 1) & 0xFF,
-                (apdu.ssn >> 7) & 0xFF,
-                (apdu.rsn << 1) & 0xFF,
-                (apdu.rsn >> 7) & 0xFF,
-                *apdu.data]
+        data.extend(_apci_struct.pack(0x68, len(apdu.data) + 4,
+                                      apdu.ssn << 1, apdu.rsn << 1))
+        data.extend(apdu.data)
 
     elif isinstance(apdu, common.APDUS):
         if apdu.rsn > 0x7FFF:
             raise ValueError('invalid receive sequence number')
-        data = [1,
-                0,
-                (apdu.rsn << 1) & 0xFF,
-                (apdu.rsn >> 7) & 0xFF]
+        data.extend(_apci_struct.pack(0x68, 4, 1, apdu.rsn << 1))
 
     elif isinstance(apdu, common.APDUU):
-        data = [apdu.function.value,
-                0,
-                0,
-                0]
+        data.extend(_apduu_data[apdu.function])
 
     else:
         raise ValueError('unsupported apdu')
 
-    return bytes(itertools.chain([0x68, len(data)], data))
+
+# start identifier, length and control fields as two 16 bit integers
+_apci_struct = struct.Struct('<BBHH')
+
+_apduu_data = {function: bytes([0x68, 4, function.value, 0, 0, 0])
+               for function in common.ApduFunction}
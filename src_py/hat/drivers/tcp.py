@@ -146,6 +146,17 @@ class Connection(aio.Resource):
         """Connection info"""
         return self._info
 
+    def get_extra_info(self,
+                       name: str,
+                       default: typing.Any = None
+                       ) -> typing.Any:
+        """Get transport information
+
+        See `asyncio.BaseTransport.get_extra_info`.
+
+        """
+        return self._writer.get_extra_info(name, default)
+
     def write(self, data: bytes):
         """Write data
 
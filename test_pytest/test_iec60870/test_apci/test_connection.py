@@ -1,5 +1,6 @@
 import asyncio
 import contextlib
+import socket
 
 import pytest
 
@@ -87,7 +88,7 @@ async def test_connect(server_port):
     # mock_server does not respont with STARTDT_CON -> connect does not end
     async with mock_server(server_port):
         # response_timeout expires
-        with pytest.raises(Exception):
+        with pytest.raises(asyncio.TimeoutError):
             await apci.connect(addr=addr_srv, response_timeout=0.1)
         # response_timeout expires
         with pytest.raises(asyncio.TimeoutError):
@@ -129,6 +130,23 @@ async def test_server(server_port):
     assert conn_srv.is_closed
 
 
+async def test_server_async_connection_cb(server_port):
+    conn_queue = aio.Queue()
+    addr_srv = tcp.Address(host='127.0.0.1', port=server_port)
+
+    async def on_connection(conn):
+        conn_queue.put_nowait(conn)
+
+    async with server(server_port, connection_cb=on_connection):
+        conn_cli = await apci.connect(addr=addr_srv)
+        conn_srv = await conn_queue.get()
+
+        assert conn_srv.is_open
+        assert conn_srv.info.remote_addr == conn_cli.info.local_addr
+
+        await conn_cli.async_close()
+
+
 async def test_connection(conn_queue, server_port):
     conn_cli = await apci.connect(
         addr=tcp.Address(host='127.0.0.1', port=server_port))
@@ -240,3 +258,164 @@ async def test_test_timeout(server_port):
     await conn.wait_closed()
 
     await conn_srv.async_close()
+
+
+async def test_invalid_ack(server_port):
+
+    async def on_conn(conn):
+        await conn.readexactly(6)
+        conn.write(
+            encoder.encode(common.APDUU(common.ApduFunction.STARTDT_CON)))
+        conn.write(encoder.encode(common.APDUS(rsn=5)))
+
+    async with mock_server(server_port, connection_cb=on_conn):
+        conn = await apci.connect(
+            addr=tcp.Address(host='127.0.0.1', port=server_port))
+        await conn.wait_closed()
+
+
+async def test_drain_concurrent_send(server_port):
+    async with server_conn_queue(server_port,
+                                 supervisory_timeout=0.02,
+                                 receive_window_size=15) as conn_queue:
+        conn_cli = await apci.connect(
+            addr=tcp.Address(host='127.0.0.1', port=server_port),
+            send_window_size=2)
+        conn_srv = await conn_queue.get()
+
+        async def produce():
+            while True:
+                conn_cli.send(b'\xab\x12')
+                await asyncio.sleep(0.001)
+
+        async def consume():
+            while True:
+                await conn_srv.receive()
+
+        async with aio.Group() as group:
+            group.spawn(produce)
+            group.spawn(consume)
+
+            # send window is kept full by producer so send queue is never
+            # empty - drain waits only for data sent prior to drain call
+            await asyncio.sleep(0.01)
+            await asyncio.wait_for(conn_cli.drain(), 0.5)
+
+        await conn_cli.async_close()
+
+
+async def test_tcp_nodelay(conn_queue, server_port):
+    conn_cli = await apci.connect(
+        addr=tcp.Address(host='127.0.0.1', port=server_port))
+    conn_srv = await conn_queue.get()
+
+    for conn in [conn_cli, conn_srv]:
+        sock = conn._conn.get_extra_info('socket')
+        assert sock.getsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY)
+
+    await conn_cli.async_close()
+    await conn_srv.async_close()
+
+
+async def read_apdu(conn):
+    header = await conn.readexactly(2)
+    body = await conn.readexactly(header[1])
+    return encoder.decode(header + body)
+
+
+def write_apdu(conn, apdu):
+    conn.write(encoder.encode(apdu))
+
+
+@contextlib.asynccontextmanager
+async def mock_server_conn(server_port):
+    conn_queue = aio.Queue()
+
+    async def on_conn(conn):
+        apdu = await read_apdu(conn)
+        assert apdu == common.APDUU(common.ApduFunction.STARTDT_ACT)
+        write_apdu(conn, common.APDUU(common.ApduFunction.STARTDT_CON))
+        conn_queue.put_nowait(conn)
+
+    async with mock_server(server_port, connection_cb=on_conn):
+        conn = await apci.connect(
+            addr=tcp.Address(host='127.0.0.1', port=server_port),
+            send_window_size=1,
+            receive_window_size=1)
+        conn_srv = await conn_queue.get()
+        try:
+            yield conn, conn_srv
+        finally:
+            await conn.async_close()
+
+
+async def test_receive_ack_piggybacked(server_port):
+    async with mock_server_conn(server_port) as (conn, conn_srv):
+        conn.send(b'\x01')
+        conn.send(b'\x02')
+
+        apdu = await read_apdu(conn_srv)
+        assert apdu == common.APDUI(ssn=0, rsn=0, data=b'\x01')
+
+        # ack frees send window while b'\x02' is queued -> receive ack is
+        # carried by next APDUI instead of APDUS
+        write_apdu(conn_srv, common.APDUI(ssn=0, rsn=1, data=b'\xab'))
+
+        apdu = await read_apdu(conn_srv)
+        assert apdu == common.APDUI(ssn=1, rsn=1, data=b'\x02')
+
+        assert await conn.receive() == b'\xab'
+
+
+async def test_receive_ack_send_window_full(server_port):
+    async with mock_server_conn(server_port) as (conn, conn_srv):
+        conn.send(b'\x01')
+        conn.send(b'\x02')
+
+        apdu = await read_apdu(conn_srv)
+        assert apdu == common.APDUI(ssn=0, rsn=0, data=b'\x01')
+
+        # send window remains full -> APDUS is sent
+        write_apdu(conn_srv, common.APDUI(ssn=0, rsn=0, data=b'\xab'))
+
+        apdu = await read_apdu(conn_srv)
+        assert apdu == common.APDUS(rsn=1)
+
+        write_apdu(conn_srv, common.APDUS(rsn=1))
+
+        apdu = await read_apdu(conn_srv)
+        assert apdu == common.APDUI(ssn=1, rsn=1, data=b'\x02')
+
+
+async def test_receive_ack_send_disabled(server_port):
+    async with server_conn_queue(server_port,
+                                 send_window_size=1,
+                                 receive_window_size=1) as conn_queue:
+        conn = await tcp.connect(
+            tcp.Address(host='127.0.0.1', port=server_port))
+        conn_srv = await conn_queue.get()
+
+        write_apdu(conn, common.APDUU(common.ApduFunction.STARTDT_ACT))
+        apdu = await read_apdu(conn)
+        assert apdu == common.APDUU(common.ApduFunction.STARTDT_CON)
+
+        conn_srv.send(b'\x01')
+        conn_srv.send(b'\x02')
+
+        apdu = await read_apdu(conn)
+        assert apdu == common.APDUI(ssn=0, rsn=0, data=b'\x01')
+
+        write_apdu(conn, common.APDUU(common.ApduFunction.STOPDT_ACT))
+        apdu = await read_apdu(conn)
+        assert apdu == common.APDUS(rsn=0)
+        apdu = await read_apdu(conn)
+        assert apdu == common.APDUU(common.ApduFunction.STOPDT_CON)
+
+        # ack frees send window while b'\x02' is queued, but sending is
+        # disabled -> APDUS is sent
+        write_apdu(conn, common.APDUI(ssn=0, rsn=1, data=b'\xab'))
+
+        apdu = await read_apdu(conn)
+        assert apdu == common.APDUS(rsn=1)
+
+        await conn.async_close()
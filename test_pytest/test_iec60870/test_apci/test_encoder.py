@@ -166,3 +166,18 @@ def test_invalid_sequence_number(sn):
 
     with pytest.raises(Exception):
         encoder.encode(common.APDUS(rsn=sn))
+
+
+def test_encode_into():
+    apdus = [common.APDUI(ssn=1, rsn=2, data=b'\x01\xab\x23'),
+             common.APDUS(rsn=123),
+             common.APDUU(function=common.ApduFunction.TESTFR_ACT)]
+
+    data = bytearray(b'\xff')
+    for apdu in apdus:
+        encoder.encode_into(apdu, data)
+    assert data == b'\xff' + b''.join(encoder.encode(apdu) for apdu in apdus)
+
+    with pytest.raises(Exception):
+        encoder.encode_into(common.APDUS(rsn=0x8000), data)
+    assert data == b'\xff' + b''.join(encoder.encode(apdu) for apdu in apdus)
@@ -29,6 +29,11 @@ async def test_connect_listen(addr):
     assert conn1.info.local_addr == conn2.info.remote_addr
     assert conn1.info.remote_addr == conn2.info.local_addr
 
+    assert conn1.get_extra_info('socket') is not None
+    peername = conn1.get_extra_info('peername')
+    assert tuple(peername[:2]) == conn1.info.remote_addr
+    assert conn1.get_extra_info('invalid', 123) == 123
+
     await conn1.async_close()
     await conn2.async_close()
     await srv.async_close()